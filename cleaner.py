@@ -1,107 +1,89 @@
-import csv
-from collections import defaultdict
+import re
 
-# Priority of email sources
-PRIORITY = {
-    "bio": 1,
-    "site": 2,
-    "site_deep": 3,
-    "guess_personal": 4
-}
+import pandas as pd
 
-def priority_value(source):
-    return PRIORITY.get(source, 99)
+from sources import PRIORITY
 
+# Rows per read_csv chunk; memory stays bounded regardless of file size
+CHUNK_ROWS = 250_000
 
-def is_valid_email(email):
-    if not email: 
-        return False
-    if "example.com" in email.lower(): 
-        return False
-    if email.strip() == "":
-        return False
-    if "@" not in email:
-        return False
-    return True
+# Single-pass email checks: one "@", no whitespace, a dot in the domain;
+# placeholder example.com addresses are rejected in any case
+_VALID_RE = re.compile(r"^[^@\s]+@[^@\s]+\.[^@\s]+$")
+_BAD_RE = re.compile(r"example\.com", re.IGNORECASE)
 
 
-def is_error_row(row):
-    # Remove rows that failed to scrape
-    if row["source"] == "error":
-        return True
-    if "profile_error" in row.get("smtp_note", ""):
-        return True
-    return False
+def valid_email_mask(emails):
+    # Vectorized check: one anchored regex match plus one
+    # case-insensitive search, no per-row .lower() copies
+    return emails.str.match(_VALID_RE.pattern, na=False) & ~emails.str.contains(
+        _BAD_RE.pattern, case=False, regex=True, na=False
+    )
 
 
-def load_rows():
-    with open("emails.csv", "r", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        return list(reader)
+def error_row_mask(df):
+    # Rows that failed to scrape
+    return (df["source"] == "error") | df["smtp_note"].str.contains(
+        "profile_error", regex=False, na=False
+    )
 
 
-def clean_rows(rows):
-    cleaned = []
+def load_chunks():
+    return pd.read_csv(
+        "emails.csv", dtype=str, keep_default_na=False, chunksize=CHUNK_ROWS
+    )
 
-    for r in rows:
-        # Skip error rows
-        if is_error_row(r):
-            continue
 
-        # Skip invalid emails
-        if not is_valid_email(r["email"]):
-            continue
+def clean_rows(df):
+    # Skip error rows + invalid emails
+    return df[~error_row_mask(df) & valid_email_mask(df["email"])]
 
-        cleaned.append(r)
 
-    return cleaned
+def select_best(cleaned):
+    # Stable sort keeps the first row among equal priorities, like the old loop
+    ranked = cleaned.assign(
+        _p=cleaned["source"].map(PRIORITY).fillna(99).astype("int8")
+    )
+    return (
+        ranked.sort_values("_p", kind="stable")
+        .drop_duplicates("username", keep="first")
+        .drop(columns="_p")
+    )
 
 
-def select_best(cleaned_rows):
-    best = {}
-
-    for row in cleaned_rows:
-        user = row["username"]
-
-        if user not in best:
-            best[user] = row
-            continue
-
-        # If new row has *better* source priority, replace
-        if priority_value(row["source"]) < priority_value(best[user]["source"]):
-            best[user] = row
-
-    return list(best.values())
-
-
-def save_output(rows):
-    if not rows:
+def save_output(df):
+    if df.empty:
         print("[!] No rows to save!")
         return
 
-    with open("emails_clean.csv", "w", newline="", encoding="utf-8") as f:
-        writer = csv.DictWriter(f, fieldnames=rows[0].keys())
-        writer.writeheader()
-        writer.writerows(rows)
+    df.to_csv("emails_clean.csv", index=False)
 
-    print(f"[✓] Saved {len(rows)} final cleaned rows → emails_clean.csv")
+    print(f"[✓] Saved {len(df)} final cleaned rows → emails_clean.csv")
 
 
 def main():
-    print("[i] Loading emails.csv…")
-    rows = load_rows()
-    print(f"[i] Loaded {len(rows)} rows.")
-
-    print("[i] Removing errors + invalid emails…")
-    valid_rows = clean_rows(rows)
-    print(f"[✓] {len(rows)} → {len(valid_rows)} valid rows.")
-
-    print("[i] Selecting best email per user…")
-    final = select_best(valid_rows)
+    print("[i] Streaming emails.csv in chunks…")
+    total = valid = 0
+    best = None
+    for chunk in load_chunks():
+        total += len(chunk)
+
+        # Filter + dedupe within the chunk, then merge with the running winners
+        valid_rows = clean_rows(chunk)
+        valid += len(valid_rows)
+        chunk_best = select_best(valid_rows)
+        if best is None:
+            best = chunk_best
+        else:
+            best = select_best(pd.concat([best, chunk_best]))
+        print(f"[i] {total} rows read, {len(best)} users so far…")
+
+    print(f"[✓] {total} → {valid} valid rows.")
+    final = best if best is not None else pd.DataFrame()
     print(f"[✓] Unique users: {len(final)}")
 
     save_output(final)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -1,10 +1,13 @@
 #!/usr/bin/env python3
+import re
 import time
 import random
 import argparse
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.chrome.options import Options
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.common.exceptions import TimeoutException
 
 
 # -------------------------------------------------------
@@ -76,51 +79,47 @@ def click_followers_button(browser, username):
 # -------------------------------------------------------
 # FIND REAL SCROLL CONTAINER BASED ON YOUR INSTAGRAM DOM
 # -------------------------------------------------------
-def detect_scroll_container(browser):
-    print("[i] Detecting followers scroll container…")
-
-    # Wait few seconds for popup to fully render
-    time.sleep(2)
-
-    # 1️⃣ FIRST: Grab the followers popup dialog
-    dialogs = browser.find_elements(By.CSS_SELECTOR, "div[role='dialog']")
-    if not dialogs:
-        raise Exception("❌ Followers dialog NOT found!")
+# Runs entirely in the page: find the last dialog, then the first div inside it
+# whose scrollTop actually moves (restored afterwards). Null until it renders.
+FIND_SCROLL_CONTAINER_JS = """
+    const dlg = document.querySelectorAll("div[role='dialog']");
+    if (!dlg.length) return null;
+    const pop = dlg[dlg.length - 1];
+    for (const d of pop.querySelectorAll('div')) {
+        if (d.clientHeight < 200) continue;
+        const before = d.scrollTop;
+        d.scrollTop = before + 300;
+        if (d.scrollTop > before) { d.scrollTop = before; return d; }
+    }
+    return null;
+"""
 
-    popup = dialogs[-1]  # Usually the last dialog is the followers popup
-    print("[✓] Followers popup dialog detected")
-
-    # 2️⃣ Grab ALL divs inside popup
-    all_divs = popup.find_elements(By.XPATH, ".//div")
-
-    # 3️⃣ Find the FIRST div whose scrollTop changes when we scroll it
-    print("[i] Searching inside popup for real scroll container…")
-
-    for div in all_divs:
-        try:
-            height = div.size.get("height", 0)
-            if height < 200:  # too small to be scrollable
-                continue
 
-            before = browser.execute_script("return arguments[0].scrollTop;", div)
-            browser.execute_script("arguments[0].scrollTop = arguments[0].scrollTop + 300;", div)
-            time.sleep(0.2)
-            after = browser.execute_script("return arguments[0].scrollTop;", div)
-
-            if after > before:  # scroll actually moved → this is our container
-                print("[⭐] FOUND scrollable container!")
-                print("   scrollTop changed:", before, "→", after)
-                return div
+def detect_scroll_container(browser):
+    print("[i] Detecting followers scroll container…")
 
-        except Exception:
-            continue
+    # Poll with one JS scan per attempt until the popup has rendered
+    try:
+        container = WebDriverWait(browser, 10).until(
+            lambda b: b.execute_script(FIND_SCROLL_CONTAINER_JS)
+        )
+    except TimeoutException:
+        raise Exception("❌ NO scrollable div found inside followers popup!")
 
-    raise Exception("❌ NO scrollable div found inside followers popup!")
+    print("[⭐] FOUND scrollable container!")
+    return container
 
 
 # -------------------------------------------------------
 # SCROLL + EXTRACT (final working version)
 # -------------------------------------------------------
+# Grab the popup markup in one JS call and pull profile links out with a regex,
+# instead of one get_attribute() round-trip per <a>
+POPUP_HTML_JS = "return arguments[0].innerHTML;"
+USER_RE = re.compile(r'href="/([A-Za-z0-9_.]+)/"')
+NON_USER_PATHS = {"p", "reels", "explore", "accounts"}
+
+
 def scroll_and_extract(browser, container, limit):
     print("[i] Extracting followers…")
 
@@ -130,18 +129,11 @@ def scroll_and_extract(browser, container, limit):
 
     while len(followers) < limit and stagnant < 15:
 
-        # extract usernames from visible items
-        links = container.find_elements(By.TAG_NAME, "a")
-        for link in links:
-            href = link.get_attribute("href")
-            if not href or "/p/" in href:
-                continue
-            try:
-                user = href.split("/")[-2]
-                if user:
-                    followers.add(user)
-            except:
-                pass
+        # extract usernames from visible items (one round-trip per scroll)
+        html = browser.execute_script(POPUP_HTML_JS, container) or ""
+        for user in set(USER_RE.findall(html)) - followers:
+            if user not in NON_USER_PATHS:
+                followers.add(user)
 
         print(f"[i] Extracted so far: {len(followers)}")
 
@@ -2,25 +2,40 @@
 import argparse
 import csv
 import json
+import os
+import random
 import re
+import threading
 import time
 import socket
-from typing import Set
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
+from typing import Set, Tuple
 from urllib.parse import urljoin
 
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
+from selectolax.parser import HTMLParser
+from urllib3.util.retry import Retry
 import instaloader
 import tldextract
 import dns.resolver
 import smtplib
 
+from sources import PRIORITY
+
 EMAIL_REGEX = re.compile(r"[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+")
+# Tail of a URL up to its userinfo ("https://" or "https://user:") - a match
+# right after this is a key/password@host, not an address
+URL_USERINFO = re.compile(r"://[^\s/@]*$")
 MAILTO_REGEX = re.compile(r"mailto:([^?]+)")
 OBFUSCATION = re.compile(
-    r"\s*\[\s*at\s*\]\s*|\s*\(\s*at\s*\)\s*|\s+at\s+|\s*\[dot\]\s*|\s*\(\s*dot\s*\)\s*|\s+dot\s+",
+    r"(?P<at>\s*\[\s*at\s*\]\s*|\s*\(\s*at\s*\)\s*|\s+at\s+)"
+    r"|(?P<dot>\s*\[dot\]\s*|\s*\(\s*dot\s*\)\s*|\s+dot\s+)",
     re.IGNORECASE,
 )
+_OBF_MAP = {"at": "@", "dot": "."}
 
 # Link-in-bio / aggregator services (bad for guessing)
 AGGREGATOR_DOMAINS = {
@@ -49,23 +64,83 @@ SOCIAL_DOMAINS = {
     "substack.com",
 }
 
+# Raw-HTML hits like logo@2x.png or bootstrap@5.3.0 are asset / package refs
+ASSET_EXTENSIONS = {
+    "png", "jpg", "jpeg", "gif", "svg", "webp", "avif", "ico", "bmp",
+    "js", "mjs", "css", "map", "json", "woff", "woff2", "ttf", "eot",
+    "mp4", "webm", "mp3", "pdf",
+}
+
+# Max concurrent fetches against a single host, shared by all worker threads
+PER_DOMAIN_FETCHES = 2
+_domain_slots = defaultdict(lambda: threading.Semaphore(PER_DOMAIN_FETCHES))
+_domain_slots_lock = threading.Lock()
+
+# Pooled keep-alive connections shared by every fetch, with light retrying
+SESSION = requests.Session()
+SESSION.headers["User-Agent"] = "Mozilla/5.0 (compatible; OutreachBot/1.0)"
+_adapter = HTTPAdapter(
+    pool_connections=128,
+    pool_maxsize=128,
+    max_retries=Retry(
+        total=2,
+        backoff_factor=0.3,
+        status_forcelist=(429, 500, 502, 503, 504),
+        raise_on_status=False,
+    ),
+)
+SESSION.mount("https://", _adapter)
+SESSION.mount("http://", _adapter)
+
+# Output files are written through a large buffer instead of per-row syscalls,
+# and rows are handed to it in batches of FLUSH_AT
+WRITE_BUFFER_BYTES = 1 << 20
+FLUSH_AT = 1000
+
+# One resolver for the whole run; a dead nameserver shouldn't stall a worker
+RESOLVER = dns.resolver.Resolver()
+RESOLVER.lifetime = 5
+
+# domain -> (status, note) from the first non-refused SMTP probe,
+# for --smtp-cache-by-domain
+_smtp_domain_verdicts = {}
+_smtp_domain_lock = threading.Lock()
+
+
+def _deobfuscate(m: re.Match) -> str:
+    # The named group that matched tells us the replacement; no string work needed
+    return _OBF_MAP[m.lastgroup]
+
 
 def clean_obfuscated_email(text: str) -> str:
-    t = OBFUSCATION.sub(
-        lambda m: "@" if "at" in m.group(0).lower() else ".", text or ""
-    )
-    return (
-        (t or "")
-        .replace(" [at] ", "@")
-        .replace(" (at) ", "@")
-        .replace(" [dot] ", ".")
-        .replace(" (dot) ", ".")
-    )
+    return OBFUSCATION.sub(_deobfuscate, text or "")
 
 
 def extract_emails_from_text(text: str) -> Set[str]:
-    text = clean_obfuscated_email(text or "")
-    return {m.group(0) for m in EMAIL_REGEX.finditer(text)}
+    return set(EMAIL_REGEX.findall(clean_obfuscated_email(text)))
+
+
+def looks_like_email(email: str) -> bool:
+    """Reject regex hits whose TLD is numeric / not a TLD or a file extension."""
+    tld = email.rstrip(".").rsplit(".", 1)[-1].lower()
+    if tld.startswith("xn--"):
+        return True
+    return len(tld) >= 2 and tld.isalpha() and tld not in ASSET_EXTENSIONS
+
+
+def emails_from_page_text(text: str) -> Set[str]:
+    """
+    Like extract_emails_from_text, but for fetched pages: drops URL userinfo
+    (https://key@host, https://user:pw@host) and asset refs like logo@2x.png.
+    """
+    text = clean_obfuscated_email(text)
+    found = set()
+    for m in EMAIL_REGEX.finditer(text):
+        if URL_USERINFO.search(text, max(0, m.start() - 256), m.start()):
+            continue
+        if looks_like_email(m.group(0)):
+            found.add(m.group(0))
+    return found
 
 
 def domain_from_url(url: str):
@@ -77,28 +152,54 @@ def domain_from_url(url: str):
     return f"{ext.domain}.{ext.suffix}"
 
 
-def mx_exists(domain: str) -> bool:
+@lru_cache(maxsize=4096)
+def _mx_lookup_cached(domain: str) -> Tuple[bool, Tuple[str, ...]]:
+    # Only definitive answers are returned (and so cached); timeouts and
+    # nameserver failures raise, and lru_cache never stores an exception
     try:
-        dns.resolver.resolve(domain, "MX")
-        return True
+        answers = RESOLVER.resolve(domain, "MX")
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        return False, ()
+    return True, tuple(r.exchange.to_text(omit_final_dot=True) for r in answers)
+
+
+def _mx_lookup(domain: str) -> Tuple[bool, Tuple[str, ...]]:
+    """Resolve MX once per domain; returns (has_mx, mx_hosts)."""
+    try:
+        # DNS is case-insensitive; one cache entry per domain however it's spelled
+        return _mx_lookup_cached(domain.lower())
     except Exception:
-        return False
+        # Transient (timeout / no nameservers): no MX for now, retry next time
+        return False, ()
 
 
-def guess_emails(full_name: str, domain: str) -> Set[str]:
-    if not domain or not full_name:
-        return set()
-    name = re.sub(r"[^a-zA-Z\s]", "", full_name).strip().lower()
+def mx_exists(domain: str) -> bool:
+    return _mx_lookup(domain)[0]
+
+
+def prefetch_mx(domains, pool: ThreadPoolExecutor):
+    """
+    Resolve a batch of domains concurrently so the per-email mx_exists calls
+    that follow are all cache hits; the wait is the slowest lookup, not the sum.
+    """
+    pending = [d for d in set(domains) if d]
+    if len(pending) > 1:
+        list(pool.map(_mx_lookup, pending))
+
+
+@lru_cache(maxsize=4096)
+def _name_bases(full_name: str) -> frozenset:
+    """Local-part candidates (no @domain) derived from a display name."""
+    name = re.sub(r"[^a-zA-Z\s]", "", full_name or "").strip().lower()
     if not name:
-        return set()
-    parts = [p for p in name.split() if p]
+        return frozenset()
+    parts = name.split()
     first = parts[0]
     last = parts[-1] if len(parts) > 1 else ""
-    fl = first[0] if first else ""
-    ll = last[0] if last else ""
 
-    bases = set()
+    bases = {first}
     if last:
+        fl, ll = first[0], last[0]
         bases |= {
             f"{first}.{last}",
             f"{first}{last}",
@@ -107,54 +208,78 @@ def guess_emails(full_name: str, domain: str) -> Set[str]:
             f"{first}_{last}",
             f"{first}-{last}",
         }
-    bases.add(first)
+    return frozenset(bases)
+
+
+def guess_emails(full_name: str, domain: str) -> Set[str]:
+    if not domain or not full_name:
+        return set()
+    return {f"{b}@{domain}" for b in _name_bases(full_name)}
+
+
+def domain_slot(url: str) -> threading.Semaphore:
+    """Semaphore limiting how many workers hit the same domain at once."""
+    d = domain_from_url(url) or url
+    with _domain_slots_lock:
+        return _domain_slots[d]
 
-    return {f"{b}@{domain}" for b in bases}
+
+def polite_fetch(url: str, max_bytes: int):
+    with domain_slot(url):
+        return extract_emails_and_links_from_url(url, max_bytes)
+
+
+def jittered_sleep(base: float):
+    # Stagger workers in 100 ms steps so they don't fire in lockstep
+    time.sleep(base + random.randint(0, 10) * 0.1)
 
 
 def http_get(url: str, timeout: int = 12):
-    headers = {"User-Agent": "Mozilla/5.0 (compatible; OutreachBot/1.0)"}
-    return requests.get(url, headers=headers, timeout=timeout, allow_redirects=True)
+    return SESSION.get(url, timeout=timeout, allow_redirects=True, stream=True)
 
 
 def extract_emails_and_links_from_url(url: str, max_bytes: int):
     """
     Fetch a page, extract:
-    - emails from text + mailto links
+    - emails from text + meta + mailto links
     - all regular links (for deeper crawling)
     """
     emails = set()
     links: Set[str] = set()
     try:
-        h = requests.head(url, timeout=8, allow_redirects=True)
-        size = int(h.headers.get("Content-Length", "0") or 0)
-        if size and size > max_bytes:
-            return set(), set(), f"skip_large:{size}"
-        r = http_get(url)
-        if r.status_code >= 400:
-            return set(), set(), f"http_{r.status_code}"
-        soup = BeautifulSoup(r.text, "html.parser")
+        # No HEAD probe: stream the GET and stop reading one byte past the cap,
+        # which works whether or not the server sends Content-Length
+        with http_get(url) as r:
+            if r.status_code >= 400:
+                return set(), set(), f"http_{r.status_code}"
+            body = r.raw.read(max_bytes + 1, decode_content=True)
+            final_url = r.url
+        if len(body) > max_bytes:
+            return set(), set(), f"skip_large:>{max_bytes}"
+        tree = HTMLParser(body)
 
         # mailto links
-        for a in soup.select('a[href^="mailto:"]'):
-            href = a.get("href", "")
+        for a in tree.css('a[href^="mailto:"]'):
+            href = a.attributes.get("href") or ""
             m = MAILTO_REGEX.search(href)
             if m:
                 emails.add(m.group(1))
 
-        # visible text + meta
+        # visible text + meta, entities decoded by the parser; scripts and
+        # styles are dropped so bundled URLs / package refs never get scanned
+        tree.strip_tags(["script", "style", "noscript"])
         blob = " ".join(
-            [soup.get_text(separator=" ", strip=True)]
-            + [m.get("content", "") for m in soup.find_all("meta")]
+            [tree.body.text(separator=" ", strip=True) if tree.body else ""]
+            + [m.attributes.get("content") or "" for m in tree.css("meta")]
         )
-        emails |= extract_emails_from_text(blob)
+        emails |= emails_from_page_text(blob)
 
         # regular links for deep crawl
-        for a in soup.find_all("a", href=True):
-            href = a["href"]
+        for a in tree.css("a[href]"):
+            href = a.attributes.get("href") or ""
             if href.startswith("#") or href.startswith("mailto:"):
                 continue
-            full = urljoin(r.url, href)
+            full = urljoin(final_url, href)
             links.add(full)
 
         return emails, links, "ok"
@@ -162,21 +287,40 @@ def extract_emails_and_links_from_url(url: str, max_bytes: int):
         return set(), set(), f"error:{type(e).__name__}"
 
 
+@lru_cache(maxsize=8192)
 def smtp_handshake_check(
-    email: str, mail_from: str = "noreply@example.com", timeout: int = 8
+    email: str,
+    mail_from: str = "noreply@example.com",
+    timeout: int = 8,
+    by_domain: bool = False,
 ):
     """
     Best-effort SMTP RCPT check.
     NOTE: On Windows, outbound port 25 is usually blocked → use without --smtp-verify.
+    With by_domain=True a domain-level verdict (accepted / unknown) is reused
+    for every other address on it (big providers answer the same for
+    everyone). "refused" is about one mailbox, so it is never shared.
     """
     try:
         _, domain = email.split("@", 1)
     except ValueError:
         return "unknown", "bad_email"
-    try:
-        answers = dns.resolver.resolve(domain, "MX")
-        mx_hosts = [r.exchange.to_text(omit_final_dot=True) for r in answers]
-    except Exception:
+    if by_domain:
+        with _smtp_domain_lock:
+            cached = _smtp_domain_verdicts.get(domain)
+        if cached:
+            status, note = cached
+            return status, f"domain_cache:{note}"
+    verdict = _smtp_probe(email, domain, mail_from, timeout)
+    if by_domain and verdict[0] != "refused":
+        with _smtp_domain_lock:
+            _smtp_domain_verdicts.setdefault(domain, verdict)
+    return verdict
+
+
+def _smtp_probe(email: str, domain: str, mail_from: str, timeout: int):
+    has_mx, mx_hosts = _mx_lookup(domain)
+    if not has_mx:
         return "unknown", "no_mx"
 
     for host in mx_hosts:
@@ -207,10 +351,176 @@ def load_usernames(path: str):
     return users
 
 
+def flush_rows(pending, writer, f, jf) -> int:
+    """Write buffered rows to the CSV and JSONL outputs in bulk, then clear."""
+    if not pending:
+        return 0
+    writer.writerows(pending)
+    jf.writelines(json.dumps(row, ensure_ascii=False) + "\n" for row in pending)
+    f.flush()
+    jf.flush()
+    n = len(pending)
+    pending.clear()
+    return n
+
+
+def jsonl_to_json_array(src: str, dst: str):
+    """Rewrite a JSON Lines file as one JSON array, one row at a time."""
+    if os.path.abspath(src) == os.path.abspath(dst):
+        raise ValueError(f"refusing to convert {src} onto itself")
+    with open(src, "r", encoding="utf-8") as fin, open(
+        dst, "w", encoding="utf-8", buffering=WRITE_BUFFER_BYTES
+    ) as fout:
+        fout.write("[")
+        first = True
+        for line in fin:
+            if not line.strip():
+                continue
+            fout.write("\n  " if first else ",\n  ")
+            pretty = json.dumps(json.loads(line), indent=2, ensure_ascii=False)
+            fout.write(pretty.replace("\n", "\n  "))
+            first = False
+        fout.write("\n]" if not first else "]")
+
+
 def is_aggregator_or_social(domain: str) -> bool:
     return domain in AGGREGATOR_DOMAINS or domain in SOCIAL_DOMAINS
 
 
+def add_candidate(candidates, u, full_name, external_url, email, source):
+    """
+    Record one found address for a profile, keyed case-insensitively.
+    If it was already found, keep whichever source ranks higher.
+    """
+    key = email.lower()
+    rank = PRIORITY.get(source, 99)
+    if key in candidates and candidates[key][0] <= rank:
+        return
+    candidates[key] = (
+        rank,
+        {
+            "username": u,
+            "full_name": full_name,
+            "external_url": external_url,
+            "email": email,
+            "source": source,
+            "mx": "",
+            "smtp_status": "",
+            "smtp_note": "",
+        },
+    )
+
+
+def process_user(
+    u: str,
+    L,
+    args,
+    fetch_pool: ThreadPoolExecutor,
+    profile_gate: threading.Semaphore,
+):
+    """
+    Scrape one profile (bio -> site -> deep links -> guesses) and return its rows.
+    Runs inside a worker thread; must not touch the output files.
+    Deep-link fetches are fanned out on fetch_pool, shared by all workers.
+    Instagram lookups (and the delay before each) go through profile_gate, so
+    instagram.com sees at most --profile-concurrency of them at a time.
+    """
+    try:
+        with profile_gate:
+            jittered_sleep(args.sleep)
+            print(f"[i] {u}")
+            profile = instaloader.Profile.from_username(L.context, u)
+    except Exception as e:
+        row = {
+            "username": u,
+            "full_name": "",
+            "external_url": "",
+            "email": "",
+            "source": "error",
+            "mx": "",
+            "smtp_status": "",
+            "smtp_note": f"profile_error:{type(e).__name__}",
+        }
+        return [row]
+
+    full_name = profile.full_name or ""
+    bio = profile.biography or ""
+    ext_url = profile.external_url or ""
+
+    # Collect every candidate first, one entry per address, so each one is
+    # MX/SMTP-verified once no matter how many steps turned it up
+    candidates = {}
+
+    # 1) Bio emails (highest confidence)
+    for em in extract_emails_from_text(bio):
+        add_candidate(candidates, u, full_name, ext_url, em, "bio")
+
+    personal_domains = set()
+    if ext_url:
+        # 2) First-level external URL: emails + outbound links
+        site_emails, links, note = polite_fetch(ext_url, args.max_site_bytes)
+        for em in site_emails:
+            add_candidate(candidates, u, full_name, ext_url, em, "site")
+
+        # 3) Deep crawl non-aggregator, non-social links to find REAL sites
+        candidate_domains = {}
+        for link in links:
+            d = domain_from_url(link)
+            if not d or is_aggregator_or_social(d):
+                continue
+            if d not in candidate_domains:
+                candidate_domains[d] = link
+
+        # Fetch the deep links side by side on the shared fetch pool
+        deep_targets = list(candidate_domains.items())[: args.max_deep_links]
+        deep_results = fetch_pool.map(
+            lambda target: polite_fetch(target[1], args.max_site_bytes), deep_targets
+        )
+        for (dom, link), (deep_emails, _, dnote) in zip(deep_targets, deep_results):
+            if deep_emails:
+                personal_domains.add(dom)
+            for em in deep_emails:
+                add_candidate(candidates, u, full_name, link, em, "site_deep")
+
+    # 4) Guess emails ONLY on domains that already yielded at least one email,
+    # and not on domains where we already hold a real (bio/site/deep) address.
+    # A name with no usable letters yields no guesses at all.
+    # Lowercased: dom comes from tldextract, so "Info@Studio.COM" must block
+    # guessing on "studio.com"
+    emitted_domains = {
+        row["email"].split("@")[-1].lower() for _, row in candidates.values()
+    }
+    if _name_bases(full_name):
+        guess_domains = personal_domains - emitted_domains
+    else:
+        guess_domains = set()
+
+    # Resolve every domain the guess + verify steps will check in one batch
+    prefetch_mx(guess_domains | emitted_domains, fetch_pool)
+
+    for dom in guess_domains:
+        if not mx_exists(dom):
+            continue
+        for em in sorted(guess_emails(full_name, dom)):
+            add_candidate(
+                candidates, u, full_name, f"https://{dom}", em, "guess_personal"
+            )
+
+    rows = []
+    for _, row in candidates.values():
+        em = row["email"]
+        mx_ok = mx_exists(em.split("@")[-1])
+        smtp_status, smtp_note = ("", "")
+        if args.smtp_verify and mx_ok:
+            smtp_status, smtp_note = smtp_handshake_check(
+                em, by_domain=args.smtp_cache_by_domain
+            )
+        row.update(mx=str(mx_ok), smtp_status=smtp_status, smtp_note=smtp_note)
+        rows.append(row)
+
+    return rows
+
+
 def main():
     ap = argparse.ArgumentParser(
         description=(
@@ -220,8 +530,31 @@ def main():
     )
     ap.add_argument("--usernames", required=True, help="Path to usernames.txt")
     ap.add_argument("--out", default="emails.csv", help="Output CSV")
-    ap.add_argument("--json", default="emails.json", help="Output JSON")
+    ap.add_argument("--json", default="emails.jsonl", help="Output JSON Lines")
+    ap.add_argument(
+        "--json-array",
+        action="store_true",
+        help="Also convert the JSON Lines output into a single JSON array file",
+    )
     ap.add_argument("--sleep", type=float, default=2.0, help="Delay between profiles")
+    ap.add_argument(
+        "--workers",
+        type=int,
+        default=20,
+        help="Profiles scraped concurrently (site fetches, DNS, SMTP)",
+    )
+    ap.add_argument(
+        "--profile-concurrency",
+        type=int,
+        default=1,
+        help="Instagram profile lookups in flight at once (1 = baseline rate)",
+    )
+    ap.add_argument(
+        "--concurrency",
+        type=int,
+        default=50,
+        help="Max deep-link fetches in flight across all profiles",
+    )
     ap.add_argument(
         "--max-site-bytes",
         type=int,
@@ -233,6 +566,14 @@ def main():
         action="store_true",
         help="Attempt SMTP RCPT handshake (may be blocked on Windows)",
     )
+    ap.add_argument(
+        "--smtp-cache-by-domain",
+        action="store_true",
+        help=(
+            "Reuse a domain's first accepted/unknown SMTP verdict for its "
+            "other addresses"
+        ),
+    )
     ap.add_argument("--login-user", default=None, help="Instagram login username")
     ap.add_argument("--login-pass", default=None, help="Instagram login password")
     ap.add_argument(
@@ -268,8 +609,13 @@ def main():
         print("No usernames found.")
         return
 
-    rows = []
-    with open(args.out, "w", newline="", encoding="utf-8") as f:
+    count = 0
+    profile_gate = threading.Semaphore(args.profile_concurrency)
+    with open(
+        args.out, "w", newline="", encoding="utf-8", buffering=WRITE_BUFFER_BYTES
+    ) as f, open(
+        args.json, "w", encoding="utf-8", buffering=WRITE_BUFFER_BYTES
+    ) as jf:
         writer = csv.DictWriter(
             f,
             fieldnames=[
@@ -285,138 +631,41 @@ def main():
         )
         writer.writeheader()
 
-        for u in users:
-            time.sleep(args.sleep)
-            print(f"[i] {u}")
-            try:
-                profile = instaloader.Profile.from_username(L.context, u)
-            except Exception as e:
-                row = {
-                    "username": u,
-                    "full_name": "",
-                    "external_url": "",
-                    "email": "",
-                    "source": "error",
-                    "mx": "",
-                    "smtp_status": "",
-                    "smtp_note": f"profile_error:{type(e).__name__}",
-                }
-                rows.append(row)
-                writer.writerow(row)
-                continue
-
-            full_name = profile.full_name or ""
-            bio = profile.biography or ""
-            ext_url = profile.external_url or ""
-
-            # 1) Bio emails (highest confidence)
-            for em in extract_emails_from_text(bio):
-                mx_ok = mx_exists(em.split("@")[-1])
-                smtp_status, smtp_note = ("", "")
-                if args.smtp_verify and mx_ok:
-                    smtp_status, smtp_note = smtp_handshake_check(em)
-                row = {
-                    "username": u,
-                    "full_name": full_name,
-                    "external_url": ext_url,
-                    "email": em,
-                    "source": "bio",
-                    "mx": str(mx_ok),
-                    "smtp_status": smtp_status,
-                    "smtp_note": smtp_note,
-                }
-                rows.append(row)
-                writer.writerow(row)
-
-            if not ext_url:
-                continue
-
-            # 2) First-level external URL: emails + outbound links
-            site_emails, links, note = extract_emails_and_links_from_url(
-                ext_url, args.max_site_bytes
+        with ThreadPoolExecutor(
+            max_workers=args.concurrency
+        ) as fetch_pool, ThreadPoolExecutor(max_workers=args.workers) as executor:
+            # A generator, not a list: as_completed drops each future once it
+            # is yielded, so finished rows don't stay reachable until the end
+            futures = (
+                executor.submit(process_user, u, L, args, fetch_pool, profile_gate)
+                for u in users
             )
-            for em in site_emails:
-                mx_ok = mx_exists(em.split("@")[-1])
-                smtp_status, smtp_note = ("", "")
-                if args.smtp_verify and mx_ok:
-                    smtp_status, smtp_note = smtp_handshake_check(em)
-                row = {
-                    "username": u,
-                    "full_name": full_name,
-                    "external_url": ext_url,
-                    "email": em,
-                    "source": "site",
-                    "mx": str(mx_ok),
-                    "smtp_status": smtp_status,
-                    "smtp_note": smtp_note,
-                }
-                rows.append(row)
-                writer.writerow(row)
-
-            # 3) Deep crawl non-aggregator, non-social links to find REAL sites
-            candidate_domains = {}
-            for link in links:
-                d = domain_from_url(link)
-                if not d or is_aggregator_or_social(d):
-                    continue
-                if d not in candidate_domains:
-                    candidate_domains[d] = link
-
-            deep_count = 0
-            personal_domains = set()
-            for dom, link in candidate_domains.items():
-                if deep_count >= args.max_deep_links:
-                    break
-                deep_count += 1
-                deep_emails, _, dnote = extract_emails_and_links_from_url(
-                    link, args.max_site_bytes
-                )
-                if deep_emails:
-                    personal_domains.add(dom)
-                for em in deep_emails:
-                    mx_ok = mx_exists(em.split("@")[-1])
-                    smtp_status, smtp_note = ("", "")
-                    if args.smtp_verify and mx_ok:
-                        smtp_status, smtp_note = smtp_handshake_check(em)
-                    row = {
-                        "username": u,
-                        "full_name": full_name,
-                        "external_url": link,
-                        "email": em,
-                        "source": "site_deep",
-                        "mx": str(mx_ok),
-                        "smtp_status": smtp_status,
-                        "smtp_note": smtp_note,
-                    }
-                    rows.append(row)
-                    writer.writerow(row)
-
-            # 4) Guess emails ONLY on domains that already yielded at least one email
-            for dom in personal_domains:
-                if not mx_exists(dom):
-                    continue
-                for em in sorted(guess_emails(full_name, dom)):
-                    mx_ok = mx_exists(em.split("@")[-1])
-                    smtp_status, smtp_note = ("", "")
-                    if args.smtp_verify and mx_ok:
-                        smtp_status, smtp_note = smtp_handshake_check(em)
-                    row = {
-                        "username": u,
-                        "full_name": full_name,
-                        "external_url": f"https://{dom}",
-                        "email": em,
-                        "source": "guess_personal",
-                        "mx": str(mx_ok),
-                        "smtp_status": smtp_status,
-                        "smtp_note": smtp_note,
-                    }
-                    rows.append(row)
-                    writer.writerow(row)
-
-    with open(args.json, "w", encoding="utf-8") as jf:
-        json.dump(rows, jf, indent=2, ensure_ascii=False)
-
-    print(f"[✓] Wrote {len(rows)} rows -> {args.out} and {args.json}")
+            # Rows are only written here, on the main thread, so no lock is needed
+            pending = []
+            try:
+                for fut in as_completed(futures):
+                    pending.extend(fut.result())
+                    if len(pending) >= FLUSH_AT:
+                        count += flush_rows(pending, writer, f, jf)
+            except BaseException:
+                # Ctrl-C or a failed worker: drop queued users instead of
+                # letting the executors' exit scrape them all for nothing
+                executor.shutdown(wait=False, cancel_futures=True)
+                fetch_pool.shutdown(wait=False, cancel_futures=True)
+                raise
+            finally:
+                count += flush_rows(pending, writer, f, jf)
+
+    outputs = f"{args.out} and {args.json}"
+    if args.json_array:
+        stem, ext = os.path.splitext(args.json)
+        # Never reuse the JSONL path itself: opening it for writing would
+        # truncate the rows before they are read
+        array_path = stem + (".array.json" if ext == ".json" else ".json")
+        jsonl_to_json_array(args.json, array_path)
+        outputs += f" (+ {array_path})"
+
+    print(f"[✓] Wrote {count} rows -> {outputs}")
 
 
 if __name__ == "__main__":
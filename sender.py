@@ -1,55 +1,144 @@
 #!/usr/bin/env python3
-import argparse, csv, json, os, random, smtplib
+import argparse, csv, itertools, json, os, random, smtplib
 from email.mime.text import MIMEText
 from email.utils import formataddr
-from openpyxl import Workbook
+import xlsxwriter
+
+_SUBJECTS_TMPL = (
+    "A quick note for {first}",
+    "Something small for you, {first}",
+    "This reminded me of you, {first}",
+    "Hey {first}",
+    "A thought you might like, {first}",
+    "Your content made me think of this, {first}",
+    "A tiny journaling thought, {first}",
+    "Made me think of your page, {first}",
+    "Hi {first}",
+    "Sharing something with you, {first}",
+)
 
-def generate_subject(full_name: str, username: str):
+# DM-style short email text, includes "Sentari AI" exactly once and varies tone.
+_DM_VARIANTS = (
+    "Hey @{u}, fellow journaling nerd here — I’ve been using Sentari AI and it’s helped me notice little shifts in mood and habits. {p}",
+    "Hi @{u}! I love how you share reflective posts — thought you might vibe with Sentari AI; it’s a gentle journaling companion for personal growth. {p}",
+    "Hey @{u}, your page gave me cozy notebook energy 📖 Lately I’ve been trying Sentari AI to track mood threads — it’s been surprisingly grounding. {p}",
+    "Hi @{u} 🌿 I’m a journaling fan too, and Sentari AI nudged me into more mindful check-ins — figured I’d share in case it sparks anything. {p}",
+    "Hey @{u}! I’m curious how you keep up your journaling rhythm — I’ve been leaning on Sentari AI and enjoying the reflective prompts. {p}",
+    "Hi @{u} 💭 Your content feels super thoughtful — sharing Sentari AI since it’s helped me reflect without the pressure to be ‘perfect.’ {p}",
+)
+
+def generate_subject(full_name: str, username: str, template: str = None):
     first = full_name.split()[0] if full_name else username
+    return (template or random.choice(_SUBJECTS_TMPL)).format(first=first)
 
-    subjects = [
-        f"A quick note for {first}",
-        f"Something small for you, {first}",
-        f"This reminded me of you, {first}",
-        f"Hey {first}",
-        f"A thought you might like, {first}",
-        f"Your content made me think of this, {first}",
-        f"A tiny journaling thought, {first}",
-        f"Made me think of your page, {first}",
-        f"Hi {first}",
-        f"Sharing something with you, {first}",
-    ]
-    return random.choice(subjects)
-
-# DM-style short email text, includes "Sentari AI" exactly once and varies tone.
-def generate_dm_style_email(to_user: str, personalization: str = "") -> str:
-    variants = [
-        "Hey @{u}, fellow journaling nerd here — I’ve been using Sentari AI and it’s helped me notice little shifts in mood and habits. {p}",
-        "Hi @{u}! I love how you share reflective posts — thought you might vibe with Sentari AI; it’s a gentle journaling companion for personal growth. {p}",
-        "Hey @{u}, your page gave me cozy notebook energy 📖 Lately I’ve been trying Sentari AI to track mood threads — it’s been surprisingly grounding. {p}",
-        "Hi @{u} 🌿 I’m a journaling fan too, and Sentari AI nudged me into more mindful check-ins — figured I’d share in case it sparks anything. {p}",
-        "Hey @{u}! I’m curious how you keep up your journaling rhythm — I’ve been leaning on Sentari AI and enjoying the reflective prompts. {p}",
-        "Hi @{u} 💭 Your content feels super thoughtful — sharing Sentari AI since it’s helped me reflect without the pressure to be ‘perfect.’ {p}",
-    ]
-    msg = random.choice(variants).format(u=to_user or "there", p=personalization or "").strip()
+def generate_dm_style_email(to_user: str, personalization: str = "", variant: str = None) -> str:
+    msg = (variant or random.choice(_DM_VARIANTS)).format(u=to_user or "there", p=personalization or "").strip()
     return " ".join(msg.split())
 
-def send_email(smtp_server, smtp_port, sender_email, sender_name, sender_pass, to_email, subject, body):
+def iter_recipients(path, only_verified=False):
+    """Yield usable, de-duplicated rows from the scraper CSV one at a time."""
+    seen = set()
+    with open(path, newline="", encoding="utf-8") as f:
+        for r in csv.DictReader(f):
+            email = (r.get("email") or "").strip()
+            if not email:
+                continue
+            em = r["email"].lower()
+            if em in seen: continue
+            if only_verified:
+                mx_ok = r.get("mx","").lower() == "true"
+                smtp_ok = r.get("smtp_status","") in ("accepted","unknown")
+                if not (mx_ok and smtp_ok):
+                    continue
+            seen.add(em)
+            yield r
+
+def build_message(sender_email, sender_name, to_email, subject, body):
     msg = MIMEText(body, "plain", "utf-8")
     msg["Subject"] = subject
     msg["From"] = formataddr((sender_name, sender_email))
     msg["To"] = to_email
-
-    with smtplib.SMTP(smtp_server, smtp_port) as server:
-        server.starttls()
-        server.login(sender_email, sender_pass)
-        server.sendmail(sender_email, [to_email], msg.as_string())
+    return msg
+
+class SMTPPool:
+    """Keeps one logged-in SMTP connection for the whole batch, so
+    STARTTLS + LOGIN is paid once instead of once per recipient."""
+
+    def __init__(self, smtp_server, smtp_port, sender_email, sender_name, sender_pass):
+        self.smtp_server, self.smtp_port = smtp_server, smtp_port
+        self.sender_email, self.sender_name, self.sender_pass = sender_email, sender_name, sender_pass
+        self._conn = None
+
+    def get(self):
+        if self._conn is None:
+            conn = smtplib.SMTP(self.smtp_server, self.smtp_port)
+            try:
+                conn.starttls()
+                conn.login(self.sender_email, self.sender_pass)
+            except Exception:
+                # Don't leak a socket per recipient when TLS or auth fails
+                conn.close()
+                raise
+            self._conn = conn
+        return self._conn
+
+    def _drop(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try: conn.close()
+            except Exception: pass
+
+    def send(self, to_email, subject, body):
+        msg = build_message(self.sender_email, self.sender_name, to_email, subject, body).as_string()
+        try:
+            self.get().sendmail(self.sender_email, [to_email], msg)
+        except smtplib.SMTPServerDisconnected:
+            # Server dropped the idle session; reconnect and retry once
+            self._drop()
+            self.get().sendmail(self.sender_email, [to_email], msg)
+
+    def close(self):
+        conn, self._conn = self._conn, None
+        if conn is not None:
+            try: conn.quit()
+            except Exception: conn.close()
+
+class StatusLog:
+    """Streams the per-recipient status log to .xlsx (constant-memory writer) or .csv."""
+
+    HEADER = ["username","email","full_name","sent_status","note","preview_body"]
+
+    def __init__(self, path, fmt="xlsx"):
+        self.path, self.fmt = path, fmt
+        if fmt == "csv":
+            self._f = open(path, "w", newline="", encoding="utf-8")
+            self._writer = csv.writer(self._f)
+        else:
+            self._wb = xlsxwriter.Workbook(path, {"constant_memory": True})
+            self._ws = self._wb.add_worksheet("EmailStatus")
+            self._row = 0
+        self.write(self.HEADER)
+
+    def write(self, values):
+        if self.fmt == "csv":
+            self._writer.writerow(values)
+        else:
+            self._ws.write_row(self._row, 0, values)
+            self._row += 1
+
+    def close(self):
+        if self.fmt == "csv":
+            self._f.close()
+        else:
+            self._wb.close()
 
 def main():
     ap = argparse.ArgumentParser(description="Send personalized emails and log delivery status.")
     ap.add_argument("--csv", default="emails.csv", help="Input CSV from scraper")
     ap.add_argument("--out-json", default="email_status.json", help="Output JSON log")
-    ap.add_argument("--out-xlsx", default="email_status.xlsx", help="Output Excel log")
+    ap.add_argument("--out-xlsx", default="email_status.xlsx", help="Output Excel log (--format xlsx)")
+    ap.add_argument("--out-csv", default="email_status.csv", help="Output CSV log (--format csv)")
+    ap.add_argument("--format", choices=("xlsx","csv"), default="xlsx", help="Status log format; csv is cheapest for very large runs")
     ap.add_argument("--only-verified", action="store_true", help="Send only if mx==True and smtp_status in {accepted, unknown}")
     ap.add_argument("--limit", type=int, default=100, help="Max emails to send this run")
     ap.add_argument("--smtp-server", default=os.getenv("SMTP_SERVER","smtp.gmail.com"))
@@ -63,66 +152,48 @@ def main():
     if not args.dry_run and not args.from_pass:
         raise SystemExit("Missing sender password. Pass via --from-pass or SENDER_PASS env var.")
 
-    # Read CSV
-    rows = []
-    with open(args.csv, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for r in reader:
-            email = (r.get("email") or "").strip()
-            if not email:
-                continue
-            rows.append(r)
-
-    # Filter & limit
-    selected, seen = [], set()
-    for r in rows:
-        em = r["email"].lower()
-        if em in seen: continue
-        if args.only_verified:
-            mx_ok = r.get("mx","").lower() == "true"
-            smtp_ok = r.get("smtp_status","") in ("accepted","unknown")
-            if not (mx_ok and smtp_ok):
-                continue
-        seen.add(em)
-        selected.append(r)
-        if len(selected) >= args.limit:
-            break
+    # Stream CSV: filter & limit without reading the rest of the file
+    selected = list(itertools.islice(iter_recipients(args.csv, args.only_verified), args.limit))
 
     print(f"[i] Sending to {len(selected)} recipients (limit={args.limit}, only_verified={args.only_verified})")
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "EmailStatus"
-    ws.append(["username","email","full_name","sent_status","note","preview_body"])
+    status_log = StatusLog(args.out_csv if args.format == "csv" else args.out_xlsx, args.format)
 
     log = []
-    for r in selected:
-        username = r.get("username") or ""
-        to_email = r.get("email") or ""
-        full_name = r.get("full_name") or username
-        personalization = ""  # plug in your own heuristics if you store bios/domains
-
-        body = generate_dm_style_email(username or full_name, personalization)
-        subject = generate_subject(full_name, username)
-
-        sent = "dry_run" if args.dry_run else "failed"
-        note = ""
-        try:
-            if not args.dry_run:
-                send_email(args.smtp_server, args.smtp_port, args.from_email, args.from_name, args.from_pass, to_email, subject, body)
-                sent = "success"
-        except Exception as e:
-            sent = "failed"
-            note = type(e).__name__
-
-        ws.append([username, to_email, full_name, sent, note, body])
-        log.append({"username":username,"email":to_email,"full_name":full_name,"sent_status":sent,"note":note,"preview_body":body})
+    pool = SMTPPool(args.smtp_server, args.smtp_port, args.from_email, args.from_name, args.from_pass)
+    # Pick every recipient's template up front in one call each
+    subject_tmpls = random.choices(_SUBJECTS_TMPL, k=len(selected))
+    dm_variants = random.choices(_DM_VARIANTS, k=len(selected))
+    try:
+        for r, subject_tmpl, dm_variant in zip(selected, subject_tmpls, dm_variants):
+            username = r.get("username") or ""
+            to_email = r.get("email") or ""
+            full_name = r.get("full_name") or username
+            personalization = ""  # plug in your own heuristics if you store bios/domains
+
+            body = generate_dm_style_email(username or full_name, personalization, dm_variant)
+            subject = generate_subject(full_name, username, subject_tmpl)
+
+            sent = "dry_run" if args.dry_run else "failed"
+            note = ""
+            try:
+                if not args.dry_run:
+                    pool.send(to_email, subject, body)
+                    sent = "success"
+            except Exception as e:
+                sent = "failed"
+                note = type(e).__name__
+
+            status_log.write([username, to_email, full_name, sent, note, body])
+            log.append({"username":username,"email":to_email,"full_name":full_name,"sent_status":sent,"note":note,"preview_body":body})
+    finally:
+        pool.close()
+        status_log.close()
 
-    wb.save(args.out_xlsx)
     with open(args.out_json, "w", encoding="utf-8") as jf:
         json.dump(log, jf, indent=2, ensure_ascii=False)
 
-    print(f"[✓] Logged to {args.out_xlsx} and {args.out_json}")
+    print(f"[✓] Logged to {status_log.path} and {args.out_json}")
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,8 @@
+# Priority of email sources (lower = higher confidence).
+# Shared by scraper.py (per-profile dedupe) and cleaner.py (best per user).
+PRIORITY = {
+    "bio": 1,
+    "site": 2,
+    "site_deep": 3,
+    "guess_personal": 4
+}